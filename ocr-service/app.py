@@ -1,23 +1,55 @@
 import cv2
 import numpy as np
 import pytesseract
-from fastapi import FastAPI, UploadFile
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Request, UploadFile
+from fastapi.responses import ORJSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-import base64
-import io
+import asyncio
 from text_parser import parser
 import os
-from PIL import Image, ImageEnhance, ImageFilter
 import logging
-import requests
-import json
+import orjson
+import threading
+import queue
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+# Tesseract spreads each page over OpenMP threads; with requests already running
+# concurrently on worker threads that oversubscribes the CPU, so default to one.
+# Set before the optional backends below load libtesseract in-process
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+# Optional in-process Tesseract bindings; pytesseract's subprocess is used otherwise
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+# SIMD-accelerated base64 when installed; same API as the stdlib module
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    # Load the OCR model off the event loop once the worker process is up
+    loop = asyncio.get_running_loop()
+    if ocr_processor.use_gpu:
+        await loop.run_in_executor(ocr_executor, ocr_processor.load_gpu_reader)
+    # Also covers a GPU reader that failed to load
+    if not ocr_processor.use_gpu:
+        await loop.run_in_executor(ocr_executor, ocr_processor.warm_up_tesseract)
+    yield
+
+# orjson is markedly faster than stdlib json for the OCR text and item lists
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -28,12 +60,147 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def cuda_available():
+    """Whether torch is installed and can see a GPU. torch (and easyocr) take seconds
+    to import, so they are only imported once OCR_USE_GPU has asked for the GPU engine"""
+    try:
+        import torch
+    except ImportError:
+        return False
+    return torch.cuda.is_available()
+
+def join_text_boxes(boxes):
+    """Join EasyOCR (bbox, text, confidence) boxes into lines, left to right.
+
+    EasyOCR returns each word group as its own box, but the receipt parser needs an
+    item's name and price on one line, so boxes whose vertical centers are within
+    half a typical box height of each other are treated as the same row.
+    """
+    if not boxes:
+        return ""
+    rows = []
+    for bbox, text, _ in boxes:
+        ys = [point[1] for point in bbox]
+        rows.append(((min(ys) + max(ys)) / 2, max(ys) - min(ys), min(point[0] for point in bbox), text))
+    rows.sort()
+    tolerance = sorted(height for _, height, _, _ in rows)[len(rows) // 2] / 2
+    lines = []
+    line = [rows[0]]
+    for row in rows[1:]:
+        # Compare with the row's running mean so a slight skew doesn't split it
+        if abs(row[0] - sum(r[0] for r in line) / len(line)) <= tolerance:
+            line.append(row)
+        else:
+            lines.append(line)
+            line = [row]
+    lines.append(line)
+    return '\n'.join(' '.join(text for _, _, _, text in sorted(line, key=lambda r: r[2])) for line in lines)
+
 class OptimizedOCRProcessor:
     """Optimized OCR processor using the best configuration from fine-tuning"""
     
     def __init__(self):
         # Use the best configuration from fine-tuning: resize + PSM 6 OEM 1
         self.best_config = '--psm 6 --oem 1'
+        
+        # Optionally point Tesseract at another model set, e.g. the integer-quantized
+        # tessdata_fast LSTM models, which trade a little accuracy for speed
+        tessdata_dir = os.getenv("OCR_TESSDATA_DIR")
+        if tessdata_dir:
+            self.best_config += f' --tessdata-dir "{tessdata_dir}"'
+        
+        # The debug image is a single shared file, so only write it when asked
+        # to and never from two requests at once
+        self.save_debug_image = os.getenv("OCR_SAVE_DEBUG_IMAGE", "false").lower() == "true"
+        self._debug_image_lock = threading.Lock()
+        
+        # Optionally crop phone photos down to the receipt paper so Tesseract skips the
+        # background. Off until it has won on real photos in test_tesseract_finetune.py
+        self.crop_to_receipt = os.getenv("OCR_CROP_TO_RECEIPT", "false").lower() == "true"
+        
+        # Optionally run recognition on a CUDA-backed EasyOCR reader. Tesseract is the
+        # engine the service was tuned with, so this needs OCR_USE_GPU=true as well as
+        # a GPU; installing torch alone doesn't switch engines. The model takes seconds
+        # to load, so load_gpu_reader() builds it at app startup rather than on import
+        self.use_gpu = os.getenv("OCR_USE_GPU", "false").lower() == "true" and cuda_available()
+        self.gpu_reader = None
+        if self.use_gpu:
+            self._gpu_reader_lock = threading.Lock()
+        
+        # With tesserocr, keep loaded Tesseract engines around instead of spawning a
+        # process and reloading the model per request. An engine serves one request
+        # at a time, so idle ones wait in a pool that grows to peak concurrency.
+        # Engines are only built when used, so the pool costs nothing on GPU hosts
+        # and is ready if the GPU reader fails to load
+        self.tess_apis = None
+        if tesserocr is not None:
+            self._tess_api_args = {"psm": tesserocr.PSM.SINGLE_BLOCK, "oem": tesserocr.OEM.LSTM_ONLY}
+            if tessdata_dir:
+                self._tess_api_args["path"] = tessdata_dir
+            self.tess_apis = queue.Queue()
+            if not self.use_gpu:
+                logger.info("Using in-process Tesseract via tesserocr")
+    
+    def load_gpu_reader(self):
+        """Build the EasyOCR GPU reader, falling back to Tesseract if that fails (blocking)"""
+        try:
+            import easyocr
+            self.gpu_reader = easyocr.Reader(['en'], gpu=True)
+            logger.info("EasyOCR GPU reader initialized")
+        except Exception as e:
+            # e.g. easyocr isn't installed, or the model download or CUDA init failed;
+            # keep serving with Tesseract
+            logger.error(f"EasyOCR GPU reader failed to load, using Tesseract instead: {e}")
+            self.use_gpu = False
+    
+    def warm_up_tesseract(self):
+        """OCR a blank image so the first request doesn't pay for loading the model (blocking)"""
+        blank = np.full((32, 32), 255, np.uint8)
+        try:
+            if self.tess_apis is not None:
+                # Also leaves the first engine waiting in the pool
+                self._tesserocr_text(blank)
+            else:
+                # Pulls the binary and traineddata into the page cache
+                pytesseract.image_to_string(blank, config=self.best_config)
+            logger.info("Tesseract warmed up")
+        except Exception as e:
+            logger.warning(f"Tesseract warm-up failed: {e}")
+    
+    def _tesserocr_text(self, img_array):
+        """Run a pooled tesserocr engine on a grayscale image"""
+        try:
+            api = self.tess_apis.get_nowait()
+        except queue.Empty:
+            api = tesserocr.PyTessBaseAPI(**self._tess_api_args)
+        try:
+            h, w = img_array.shape
+            api.SetImageBytes(img_array.tobytes(), w, h, 1, w)
+            return api.GetUTF8Text()
+        finally:
+            self.tess_apis.put(api)
+    
+    def _receipt_region(self, gray):
+        """Crop to the bounding box of the receipt paper, or return the image unchanged"""
+        # The paper is the largest bright region; find it on a quarter-size copy
+        small = cv2.pyrDown(cv2.pyrDown(gray))
+        _, mask = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if not contours:
+            return gray
+        x, y, w, h = cv2.boundingRect(max(contours, key=cv2.contourArea))
+        # Scans and tight crops are nearly all paper, and a small bright patch is
+        # more likely glare than the receipt; leave those alone
+        if not 0.2 <= (w * h) / (small.shape[0] * small.shape[1]) <= 0.9:
+            return gray
+        sy = gray.shape[0] / small.shape[0]
+        sx = gray.shape[1] / small.shape[1]
+        pad = 10
+        x0, y0 = max(int(x * sx) - pad, 0), max(int(y * sy) - pad, 0)
+        x1, y1 = int((x + w) * sx) + pad, int((y + h) * sy) + pad
+        receipt = gray[y0:y1, x0:x1]
+        logger.info(f"Cropped receipt region {receipt.shape[1]}x{receipt.shape[0]} from {gray.shape[1]}x{gray.shape[0]}")
+        return receipt
     
     def preprocess_optimized(self, img_array):
         """Apply the optimized preprocessing that worked best"""
@@ -46,11 +213,21 @@ class OptimizedOCRProcessor:
             img_array = cv2.resize(img_array, (new_width, new_height))
             logger.info(f"Resized image from {w}x{h} to {new_width}x{new_height}")
         
-        # Convert to grayscale for better OCR
-        gray = cv2.cvtColor(img_array, cv2.COLOR_BGR2GRAY)
+        # Convert to grayscale for better OCR (images decoded here already are)
+        if img_array.ndim == 3:
+            gray = cv2.cvtColor(img_array, cv2.COLOR_BGR2GRAY)
+        else:
+            gray = img_array
+        
+        # Drop the background around the receipt; cropping after the resize keeps
+        # the text at the scale the config was tuned for
+        if self.crop_to_receipt:
+            gray = self._receipt_region(gray)
         
         # Save debug image
-        cv2.imwrite("debug_optimized.png", gray)
+        if self.save_debug_image:
+            with self._debug_image_lock:
+                cv2.imwrite("debug_optimized.png", gray)
         
         return gray
     
@@ -62,8 +239,16 @@ class OptimizedOCRProcessor:
         processed_img = self.preprocess_optimized(img_array)
         
         try:
-            logger.info(f"Using optimized config: {self.best_config}")
-            text = pytesseract.image_to_string(processed_img, config=self.best_config)
+            if self.gpu_reader is not None:
+                logger.info("Using EasyOCR GPU reader")
+                # Requests run on worker threads; the reader is shared, so one at a time
+                with self._gpu_reader_lock:
+                    text = join_text_boxes(self.gpu_reader.readtext(processed_img, detail=1, batch_size=8))
+            elif self.tess_apis is not None:
+                text = self._tesserocr_text(processed_img)
+            else:
+                logger.info(f"Using optimized config: {self.best_config}")
+                text = pytesseract.image_to_string(processed_img, config=self.best_config)
 
             # Clean up the text
             text = text.strip()
@@ -83,10 +268,11 @@ class OptimizedOCRProcessor:
     def perform_optimized_ocr(self, img_array):
         """Main OCR function with optimized processing"""
         try:
-            # Ensure img_array is properly decoded as an image
+            # Ensure img_array is properly decoded as an image; OCR only needs
+            # luminance, so decode straight to grayscale and skip the color pass
             if len(img_array.shape) == 1:
                 logger.info(f"Decoding 1D array of shape {img_array.shape}")
-                img_array = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
+                img_array = cv2.imdecode(img_array, cv2.IMREAD_GRAYSCALE)
                 if img_array is None:
                     raise ValueError("Failed to decode image from bytes")
             
@@ -103,89 +289,180 @@ class OptimizedOCRProcessor:
             logger.error(f"OCR processing failed: {e}")
             return ""
 
+class OCRResultCache:
+    """Bounded LRU cache of OCR text keyed by a hash of the image bytes"""
+    
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Per-key locks for images currently being OCR'd
+        self._in_flight = {}
+    
+    @staticmethod
+    def key_for(image_bytes):
+        return hashlib.blake2b(image_bytes, digest_size=16).digest()
+    
+    def get(self, key):
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+            return text
+    
+    def put(self, key, text):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = text
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def get_or_compute(self, key, compute):
+        """Return cached text for key, computing it only once for concurrent duplicate uploads"""
+        text = self.get(key)
+        if text is not None:
+            logger.info("OCR cache hit")
+            return text
+        with self._lock:
+            key_lock = self._in_flight.setdefault(key, threading.Lock())
+        try:
+            with key_lock:
+                # Whoever held the lock first has usually filled the cache by now
+                text = self.get(key)
+                if text is None:
+                    text = compute()
+                    # Empty text means OCR failed; don't pin failures in the cache
+                    if text:
+                        self.put(key, text)
+                return text
+        finally:
+            with self._lock:
+                if self._in_flight.get(key) is key_lock:
+                    del self._in_flight[key]
+
+# Retries and re-uploads of the same receipt skip OCR entirely
+ocr_cache = OCRResultCache(int(os.getenv("OCR_CACHE_SIZE", "512")))
+
+# Global OCR processor instance (configuration is static, so build it once)
+ocr_processor = OptimizedOCRProcessor()
+
+# OCR gets its own bounded pool rather than Starlette's shared 40-thread one:
+# each job is a CPU-bound Tesseract run, so more than one per core only thrashes.
+# uvicorn --workers runs OCR_WORKERS copies of this process, each with its own
+# pool, so by default they split the cores instead of each taking all of them
+OCR_PROCESSES = max(int(os.getenv("OCR_WORKERS", "1")), 1)
+ocr_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("OCR_MAX_WORKERS", str(max((os.cpu_count() or 1) // OCR_PROCESSES, 1)))),
+    thread_name_prefix="ocr",
+)
+
 def perform_ocr(img):
     """Main OCR function - using optimized processor"""
-    processor = OptimizedOCRProcessor()
-    return processor.perform_optimized_ocr(img)
+    return ocr_processor.perform_optimized_ocr(img)
+
+def process_image_bytes(image_bytes):
+    """Run OCR and parsing on raw encoded image bytes (blocking, run on ocr_executor)"""
+    img_array = np.frombuffer(image_bytes, np.uint8)
+    
+    logger.info(f"Processing image of shape: {img_array.shape}")
+    
+    cache_key = OCRResultCache.key_for(image_bytes)
+    ocr_text = ocr_cache.get_or_compute(cache_key, lambda: perform_ocr(img_array))
+    
+    # Parse the OCR text into structured JSON
+    parsed_result = parser.parse_receipt_text(ocr_text)
+    
+    # Add the raw OCR text and metadata for debugging
+    parsed_result["text"] = ocr_text
+    parsed_result["success"] = True
+    parsed_result["confidence"] = 0.8
+    parsed_result["processing_time"] = 0
+    parsed_result["text_length"] = len(ocr_text)
+    
+    logger.info(f"Parsing completed. Items found: {len(parsed_result.get('items', []))}")
+    
+    return parsed_result
+
+def process_base64_image(image_data):
+    """Decode a base64 image (blocking, run on ocr_executor) and run the shared pipeline"""
+    # Remove data URL prefix if present, slicing the payload out once rather
+    # than splitting the whole string into a list
+    start = image_data.find(',') + 1
+    if start:
+        end = image_data.find(',', start)
+        image_data = image_data[start:end if end != -1 else len(image_data)]
+    return process_image_bytes(base64.b64decode(image_data))
+
+# Reject oversized base64 payloads before decoding them (about 11 MB of image)
+MAX_BASE64_LEN = int(os.getenv("OCR_MAX_BASE64_MB", "15")) * 1024 * 1024
+# The same limit for raw multipart uploads (base64 is 4 chars per 3 bytes)
+MAX_IMAGE_BYTES = MAX_BASE64_LEN * 3 // 4
+
+# Static bodies for the informational endpoints, serialized once at import
+ROOT_BODY = orjson.dumps({"message": "Welcome to the Hybrid OCR API"})
+HEALTH_BODY = orjson.dumps({"status": "healthy", "service": "Hybrid OCR Service"})
 
 @app.get("/")
 async def root():
-    return {"message": "Welcome to the Hybrid OCR API"}
+    return Response(content=ROOT_BODY, media_type="application/json")
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "Hybrid OCR Service"}
+    return Response(content=HEALTH_BODY, media_type="application/json")
 
 @app.post("/ocr")
-async def ocr_receipt_json(request: dict):
+async def ocr_receipt_json(request: Request):
     try:
-        # Extract base64 image from request
-        image_data = request.get("image", "")
+        # Extract base64 image from request. The body is a multi-MB JSON string,
+        # which orjson parses about 3x faster than the stdlib json FastAPI uses
+        body = orjson.loads(await request.body())
+        image_data = body.get("image", "")
         if not image_data:
-            return JSONResponse(content={"error": "No image data provided"}, status_code=400)
-        
-        # Remove data URL prefix if present
-        if ',' in image_data:
-            image_data = image_data.split(',')[1]
-        
-        # Decode base64 image
-        image_bytes = base64.b64decode(image_data)
-        img_array = np.frombuffer(image_bytes, np.uint8)
+            return ORJSONResponse(content={"error": "No image data provided"}, status_code=400)
+        if len(image_data) > MAX_BASE64_LEN:
+            return ORJSONResponse(content={"error": "Image too large"}, status_code=413)
         
-        logger.info(f"Processing image of shape: {img_array.shape}")
+        # Base64 decoding of a full photo is CPU work too, so it runs on the
+        # worker thread along with OCR and keeps the event loop free
+        parsed_result = await asyncio.get_running_loop().run_in_executor(
+            ocr_executor, process_base64_image, image_data
+        )
         
-        # Perform hybrid OCR
-        ocr_text = perform_ocr(img_array)
-        
-        # Parse the OCR text into structured JSON
-        parsed_result = parser.parse_receipt_text(ocr_text)
-        
-        # Add the raw OCR text and metadata for debugging
-        parsed_result["text"] = ocr_text
-        parsed_result["success"] = True
-        parsed_result["confidence"] = 0.8
-        parsed_result["processing_time"] = 0
-        parsed_result["text_length"] = len(ocr_text)
-        
-        logger.info(f"Parsing completed. Items found: {len(parsed_result.get('items', []))}")
-        
-        return JSONResponse(content=parsed_result, status_code=200)
+        return ORJSONResponse(content=parsed_result, status_code=200)
         
     except Exception as e:
         logger.error(f"Exception in /ocr: {e}")
-        return JSONResponse(content={"error": str(e)}, status_code=400)
+        return ORJSONResponse(content={"error": str(e)}, status_code=400)
 
+# /upload is the multipart route the web client posts raw files to
+@app.post("/upload")
 @app.post("/ocr/")
 async def ocr_receipt(file: UploadFile):
     if file.content_type and file.content_type.startswith("image"):
+        # The multipart parser has already spooled the file, so its size is known;
+        # reject oversized uploads before reading them into memory
+        if file.size is not None and file.size > MAX_IMAGE_BYTES:
+            return ORJSONResponse(content={"error": "Image too large"}, status_code=413)
         image_bytes = await file.read()
-        img_array = np.frombuffer(image_bytes, np.uint8)
         
         try:
             logger.info(f"Processing uploaded file: {file.filename}")
             
-            ocr_text = perform_ocr(img_array)
-            
-            # Parse the OCR text into structured JSON
-            parsed_result = parser.parse_receipt_text(ocr_text)
-            
-            # Add the raw OCR text and metadata for debugging
-            parsed_result["text"] = ocr_text
-            parsed_result["success"] = True
-            parsed_result["confidence"] = 0.8
-            parsed_result["processing_time"] = 0
-            parsed_result["text_length"] = len(ocr_text)
-            
-            logger.info(f"Parsing completed. Items found: {len(parsed_result.get('items', []))}")
+            # Uploaded files are already raw bytes, no base64 round-trip
+            parsed_result = await asyncio.get_running_loop().run_in_executor(
+                ocr_executor, process_image_bytes, image_bytes
+            )
             
-            return JSONResponse(content=parsed_result, status_code=200)
+            return ORJSONResponse(content=parsed_result, status_code=200)
             
         except Exception as e:
             logger.error(f"Exception in /ocr/ (file): {e}")
-            return JSONResponse(content={"error": str(e)}, status_code=400)
+            return ORJSONResponse(content={"error": str(e)}, status_code=400)
     else:
         logger.error("Uploaded file is not an image")
-        return JSONResponse(content={"error": "Uploaded file is not an image"}, status_code=400) 
+        return ORJSONResponse(content={"error": "Uploaded file is not an image"}, status_code=400) 
 
 if __name__ == "__main__":
     import uvicorn
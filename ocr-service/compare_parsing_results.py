@@ -12,6 +12,15 @@ from dataclasses import dataclass
 from difflib import SequenceMatcher
 from text_parser import parser
 
+# Header/footer markers (totals, store info, payment) matched in one scan per line
+SKIP_LINE_RE = re.compile('|'.join(map(re.escape, [
+    'SURVEY', 'WIN', 'RULES', 'STORE', 'ST#', 'OP#', 'TE#', 'TR#',
+    'SUBTOTAL', 'HST', 'TOTAL', 'VISA', 'CHARGE', 'POT WHT'
+])))
+SKU_RE = re.compile(r'\d{12}')
+WHITESPACE_RE = re.compile(r'\s+')
+PUNCTUATION_RE = re.compile(r'[^\w\s]')
+
 @dataclass
 class ParsingComparison:
     """Stores comparison results between actual and parsed text"""
@@ -27,74 +36,43 @@ class ReceiptTextAnalyzer:
     """Analyzes receipt text and extracts structured data"""
     
     def __init__(self):
-        self.price_pattern = r'\$(\d+\.\d{2})'
-        self.item_price_pattern = r'([A-Z\s]+)\s+\d+\s+\$(\d+\.\d{2})'
-        self.weight_pattern = r'(\d+\.\d{3})\s+kg\s+@\s+\$(\d+\.\d{2})/kg\s+\$(\d+\.\d{2})'
+        self.price_pattern = re.compile(r'\$(\d+\.\d{2})')
+        self.item_price_pattern = re.compile(r'([A-Z\s]+)\s+\d+\s+\$(\d+\.\d{2})')
+        self.weight_pattern = re.compile(r'(\d+\.\d{3})\s+kg\s+@\s+\$(\d+\.\d{2})/kg\s+\$(\d+\.\d{2})')
     
-    def extract_items_and_prices(self, text: str) -> Dict[str, str]:
-        """Extract items and their prices from receipt text"""
+    def extract_all_items(self, text: str) -> Dict[str, str]:
+        """Extract priced and weighted items in a single pass over the lines"""
         items = {}
+        weighted_items = {}
         
-        # Split into lines and process each line
-        lines = text.strip().split('\n')
-        
-        for line in lines:
+        for line in text.strip().split('\n'):
             line = line.strip()
             if not line:
                 continue
-                
-            # Skip header lines, totals, etc.
-            if any(skip_word in line.upper() for skip_word in [
-                'SURVEY', 'WIN', 'RULES', 'STORE', 'ST#', 'OP#', 'TE#', 'TR#',
-                'SUBTOTAL', 'HST', 'TOTAL', 'VISA', 'CHARGE', 'POT WHT'
-            ]):
-                continue
             
-            # Try to extract item and price
-            price_match = re.search(self.price_pattern, line)
-            if price_match:
-                price = price_match.group(1)
-                
-                # Extract item name (everything before the price)
-                item_part = line[:price_match.start()].strip()
-                
-                # Clean up item name
+            # Weighted items are picked up even on lines the price scan skips
+            weight_match = self.weight_pattern.search(line)
+            if weight_match:
+                item_part = line[:weight_match.start()].strip()
                 if item_part:
-                    # Remove SKU numbers and extra whitespace
-                    item_clean = re.sub(r'\d{12}', '', item_part).strip()
-                    item_clean = re.sub(r'\s+', ' ', item_clean).strip()
-                    
+                    item_clean = WHITESPACE_RE.sub(' ', item_part).strip()
                     if item_clean and len(item_clean) > 2:
-                        items[item_clean] = price
-        
-        return items
-    
-    def extract_weighted_items(self, text: str) -> Dict[str, str]:
-        """Extract weighted items and their total prices"""
-        items = {}
-        
-        lines = text.strip().split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
+                        weighted_items[item_clean] = weight_match.group(3)
+            
+            if SKIP_LINE_RE.search(line.upper()):
                 continue
             
-            # Look for weight pattern
-            weight_match = re.search(self.weight_pattern, line)
-            if weight_match:
-                weight = weight_match.group(1)
-                price_per_kg = weight_match.group(2)
-                total_price = weight_match.group(3)
-                
-                # Extract item name (everything before the weight info)
-                item_part = line[:weight_match.start()].strip()
-                
+            price_match = self.price_pattern.search(line)
+            if price_match:
+                item_part = line[:price_match.start()].strip()
                 if item_part:
-                    item_clean = re.sub(r'\s+', ' ', item_part).strip()
+                    item_clean = SKU_RE.sub('', item_part).strip()
+                    item_clean = WHITESPACE_RE.sub(' ', item_clean).strip()
                     if item_clean and len(item_clean) > 2:
-                        items[item_clean] = total_price
+                        items[item_clean] = price_match.group(1)
         
+        # Weighted totals take precedence over a plain price for the same name
+        items.update(weighted_items)
         return items
 
 class ParsingComparator:
@@ -106,9 +84,9 @@ class ParsingComparator:
     def normalize_text(self, text: str) -> str:
         """Normalize text for comparison"""
         # Convert to lowercase and remove extra whitespace
-        normalized = re.sub(r'\s+', ' ', text.lower().strip())
+        normalized = WHITESPACE_RE.sub(' ', text.lower().strip())
         # Remove punctuation for basic comparison
-        normalized = re.sub(r'[^\w\s]', '', normalized)
+        normalized = PUNCTUATION_RE.sub('', normalized)
         return normalized
     
     def calculate_similarity(self, text1: str, text2: str) -> float:
@@ -153,14 +131,10 @@ class ParsingComparator:
         similarity = self.calculate_similarity(actual_text, parsed_text)
         
         # Extract items and prices from actual text
-        actual_items = self.analyzer.extract_items_and_prices(actual_text)
-        actual_weighted_items = self.analyzer.extract_weighted_items(actual_text)
-        actual_items.update(actual_weighted_items)
+        actual_items = self.analyzer.extract_all_items(actual_text)
         
         # Extract items and prices from parsed text
-        parsed_items = self.analyzer.extract_items_and_prices(parsed_text)
-        parsed_weighted_items = self.analyzer.extract_weighted_items(parsed_text)
-        parsed_items.update(parsed_weighted_items)
+        parsed_items = self.analyzer.extract_all_items(parsed_text)
         
         # Compare items
         missing_items, extra_items, price_matches, price_mismatches = self.compare_items(
@@ -5,12 +5,31 @@ Combines your existing database with the CSV data for better coverage
 
 import csv
 import re
+from bisect import bisect_right
 from typing import Dict, List, Optional, Tuple, Any
 from dataclasses import dataclass
 import logging
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
+# Weight written in an item name, converted to kg; checked in this order
+WEIGHT_PATTERNS = [
+    (re.compile(r'(\d+(?:\.\d+)?)\s*(?:kg|kilo)'), lambda x: float(x)),
+    (re.compile(r'(\d+(?:\.\d+)?)\s*(?:g|gram)'), lambda x: float(x) / 1000),
+    (re.compile(r'(\d+(?:\.\d+)?)\s*(?:lb|pound)'), lambda x: float(x) * 0.453592),
+    (re.compile(r'(\d+(?:\.\d+)?)\s*(?:oz|ounce)'), lambda x: float(x) * 0.0283495),
+]
+
+# Extra search keywords for common CSV items, beyond the plural/singular form
+KEYWORD_VARIATIONS = {
+    'potato': ['potatoes', 'spud', 'tater'],
+    'tomato': ['tomatoes', 'cherry tomato', 'roma tomato'],
+    'chicken': ['poultry', 'breast', 'thigh', 'drumstick'],
+    'beef': ['steak', 'burger', 'ground beef'],
+    'pasta': ['spaghetti', 'macaroni', 'penne'],
+}
+
 @dataclass
 class FoodItem:
     name: str
@@ -27,6 +46,10 @@ class EnhancedEmissionsDatabase:
         if csv_file_path:
             self._load_csv_data(csv_file_path)
         self.category_mappings = self._create_category_mappings()
+        self._build_keyword_index()
+        # Item names repeat across receipts (and calculate_emissions looks each one
+        # up twice); the mappings are fixed from here on, so remember the matches
+        self._match_name = lru_cache(maxsize=4096)(self._match_name)
     
     def _load_csv_data(self, csv_file_path: str):
         """Load additional data from CSV file"""
@@ -106,16 +129,8 @@ class EnhancedEmissionsDatabase:
             keywords.append(name + 's')  # Add 's'
         
         # Add common variations
-        variations = {
-            'potato': ['potatoes', 'spud', 'tater'],
-            'tomato': ['tomatoes', 'cherry tomato', 'roma tomato'],
-            'chicken': ['poultry', 'breast', 'thigh', 'drumstick'],
-            'beef': ['steak', 'burger', 'ground beef'],
-            'pasta': ['spaghetti', 'macaroni', 'penne'],
-        }
-        
-        if name in variations:
-            keywords.extend(variations[name])
+        if name in KEYWORD_VARIATIONS:
+            keywords.extend(KEYWORD_VARIATIONS[name])
             
         return keywords
     
@@ -188,18 +203,41 @@ class EnhancedEmissionsDatabase:
         
         return mappings
     
+    def _build_keyword_index(self):
+        """Precompute the partial-match lookups; keyword priority is mapping order"""
+        self._keywords = list(self.category_mappings)
+        self._keyword_rank = {keyword: rank for rank, keyword in enumerate(self._keywords)}
+        # Alternation order is priority order, so at each position the lookahead
+        # reports the highest-priority keyword starting there
+        self._keyword_re = re.compile('(?=(' + '|'.join(map(re.escape, self._keywords)) + '))')
+        # All keywords joined in order, so one str.find locates the first keyword containing a name
+        self._joined_keywords = '\n'.join(self._keywords)
+        self._keyword_starts = []
+        offset = 0
+        for keyword in self._keywords:
+            self._keyword_starts.append(offset)
+            offset += len(keyword) + 1
+    
     def find_food_item(self, item_name: str) -> Optional[Dict[str, Any]]:
         """Find food item by name with fuzzy matching"""
-        normalized_name = item_name.lower().strip()
-        
+        return self._match_name(item_name.lower().strip())
+    
+    def _match_name(self, normalized_name: str) -> Optional[Dict[str, Any]]:
+        """Match a lowercased, stripped item name against the keyword mappings"""
         # Try exact keyword match first
         if normalized_name in self.category_mappings:
             return self.category_mappings[normalized_name]
         
-        # Try partial matches
-        for keyword, mapping in self.category_mappings.items():
-            if keyword in normalized_name or normalized_name in keyword:
-                return mapping
+        # Try partial matches: the first keyword that occurs in the name or contains it
+        best = len(self._keywords)
+        for match in self._keyword_re.finditer(normalized_name):
+            best = min(best, self._keyword_rank[match.group(1)])
+        if '\n' not in normalized_name:
+            pos = self._joined_keywords.find(normalized_name)
+            if pos != -1:
+                best = min(best, bisect_right(self._keyword_starts, pos) - 1)
+        if best < len(self._keywords):
+            return self.category_mappings[self._keywords[best]]
         
         # Try word-by-word matching
         words = normalized_name.split()
@@ -253,15 +291,8 @@ class EnhancedEmissionsDatabase:
         normalized_name = item_name.lower()
         
         # Look for weight indicators in the name
-        weight_patterns = [
-            (r'(\d+(?:\.\d+)?)\s*(?:kg|kilo)', lambda x: float(x)),
-            (r'(\d+(?:\.\d+)?)\s*(?:g|gram)', lambda x: float(x) / 1000),
-            (r'(\d+(?:\.\d+)?)\s*(?:lb|pound)', lambda x: float(x) * 0.453592),
-            (r'(\d+(?:\.\d+)?)\s*(?:oz|ounce)', lambda x: float(x) * 0.0283495),
-        ]
-        
-        for pattern, converter in weight_patterns:
-            match = re.search(pattern, normalized_name)
+        for pattern, converter in WEIGHT_PATTERNS:
+            match = pattern.search(normalized_name)
             if match:
                 return converter(match.group(1))
         
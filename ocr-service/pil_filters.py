@@ -0,0 +1,27 @@
+"""
+OpenCV versions of the PIL enhancements the Tesseract tuning sweeps try.
+Output matches ImageEnhance.Contrast(2.0) and ImageFilter.SHARPEN exactly, but works
+on the BGR arrays directly instead of round-tripping through RGB and a PIL image
+"""
+
+import cv2
+import numpy as np
+
+def pil_luma_mean(img):
+    """Mean gray level of a BGR image exactly as PIL computes it (convert("L"), rounded)"""
+    b, g, r = (img[..., i].astype(np.uint32) for i in range(3))
+    return int(((r * 19595 + g * 38470 + b * 7471 + 0x8000) >> 16).mean() + 0.5)
+
+# ImageFilter.SHARPEN: this kernel divided by 16
+SHARPEN_KERNEL = np.array([[-2, -2, -2], [-2, 32, -2], [-2, -2, -2]], np.float32)
+
+def enhance_contrast(img):
+    """PIL's ImageEnhance.Contrast(2.0) on a BGR array: 2 * img - mean gray level"""
+    return cv2.addWeighted(img, 2.0, img, 0.0, -pil_luma_mean(img))
+
+def sharpen(img):
+    """PIL's ImageFilter.SHARPEN on an array (rounded half up, 1px border untouched)"""
+    s = cv2.filter2D(img, cv2.CV_16S, SHARPEN_KERNEL)
+    out = np.clip((s + 8) >> 4, 0, 255).astype(np.uint8)
+    out[0], out[-1], out[:, 0], out[:, -1] = img[0], img[-1], img[:, 0], img[:, -1]
+    return out
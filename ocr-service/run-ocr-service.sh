@@ -7,8 +7,18 @@ source venv/bin/activate
 
 # Kill any running OCR service
 pkill -f "uvicorn app:app" || true
-sleep 2
+# Wait for it to exit (and free the port) instead of a fixed delay
+for _ in $(seq 1 50); do
+    pgrep -f "uvicorn app:app" > /dev/null || break
+    sleep 0.1
+done
 
-# Start the OCR FastAPI service
-nohup uvicorn app:app --host 0.0.0.0 --port 8000 > ocr_service.log 2>&1 &
-echo "OCR service started on port 8000. Logs: ocr_service.log" 
\ No newline at end of file
+# Start the OCR FastAPI service. One process already runs OCR on every core
+# (a thread per core, each Tesseract run single-threaded). Extra OCR_WORKERS
+# processes split the cores between them (exported so the app sees it), and
+# each keeps its own OCR result cache
+OCR_HOST="${OCR_HOST:-0.0.0.0}"
+OCR_PORT="${OCR_PORT:-8000}"
+export OCR_WORKERS="${OCR_WORKERS:-1}"
+nohup uvicorn app:app --host "$OCR_HOST" --port "$OCR_PORT" --workers "$OCR_WORKERS" > ocr_service.log 2>&1 &
+echo "OCR service started on port $OCR_PORT with $OCR_WORKERS worker(s). Logs: ocr_service.log" 
\ No newline at end of file
@@ -3,7 +3,7 @@
 Test the complete pipeline with known good OCR text
 """
 
-import json
+import orjson
 from text_parser import parser
 
 def test_complete_pipeline():
@@ -93,8 +93,8 @@ VISA TEND $62.54"""
     # Step 3: Save to JSON file (simulating database)
     print("\n=== STEP 3: SAVE TO DATABASE (JSON) ===")
     
-    with open('test_pipeline_result.json', 'w') as f:
-        json.dump(db_record, f, indent=2)
+    with open('test_pipeline_result.json', 'wb') as f:
+        f.write(orjson.dumps(db_record, option=orjson.OPT_INDENT_2))
     
     print("✅ Database record saved to: test_pipeline_result.json")
     
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Check the keyword index in emissions_db against the plain loop it replaced
+"""
+
+import random
+from emissions_db import EnhancedEmissionsDatabase
+
+DB = EnhancedEmissionsDatabase()
+
+def reference_find(db, item_name):
+    """The original find_food_item: exact key, then first keyword in or containing the name, then words"""
+    normalized_name = item_name.lower().strip()
+    if normalized_name in db.category_mappings:
+        return db.category_mappings[normalized_name]
+    for keyword, mapping in db.category_mappings.items():
+        if keyword in normalized_name or normalized_name in keyword:
+            return mapping
+    for word in normalized_name.split():
+        if len(word) > 2 and word in db.category_mappings:
+            return db.category_mappings[word]
+    return None
+
+def random_name(rng, pieces, letters, max_parts=6):
+    """Glue random keywords, keyword fragments and letters together so matches overlap"""
+    parts = []
+    for _ in range(rng.randint(0, max_parts)):
+        roll = rng.random()
+        if roll < 0.4:
+            parts.append(rng.choice(pieces))
+        elif roll < 0.7:
+            # A slice of a keyword, which only the "name in keyword" direction can match
+            keyword = rng.choice(pieces)
+            start = rng.randint(0, len(keyword))
+            parts.append(keyword[start:rng.randint(start, len(keyword))])
+        else:
+            parts.append(rng.choice(letters))
+    return ''.join(parts)
+
+def test_keyword_priority():
+    """An earlier keyword wins even when a later one matches too"""
+    assert DB.find_food_item("ground beef") is DB.category_mappings["ground beef"]
+    assert DB.find_food_item("CHICKEN SOUP") is reference_find(DB, "CHICKEN SOUP")
+    assert DB.find_food_item("") is reference_find(DB, "")
+    assert DB.find_food_item("zzzz") is None
+
+def test_matches_reference():
+    rng = random.Random(0)
+    keywords = list(DB.category_mappings)
+    pieces = keywords + [keyword.upper() for keyword in keywords]
+    for _ in range(20000):
+        name = random_name(rng, pieces, 'abeilnorst \n')
+        assert DB.find_food_item(name) is reference_find(DB, name), repr(name)
+
+if __name__ == "__main__":
+    test_keyword_priority()
+    test_matches_reference()
+    print("✅ emissions_db keyword lookups match the reference loop")
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Check that EasyOCR boxes are joined into receipt lines the text parser can read
+"""
+
+from app import join_text_boxes
+from text_parser import parser
+
+def box(x0, y0, x1, y1, text):
+    """An EasyOCR detail=1 result: four corner points, text, confidence"""
+    return ([[x0, y0], [x1, y0], [x1, y1], [x0, y1]], text, 0.9)
+
+# Two receipt rows, each split into name / SKU / price boxes, given out of order
+# and with a little skew between the boxes of a row
+RECEIPT_BOXES = [
+    box(700, 62, 780, 90, "$3.47 D"),
+    box(20, 20, 200, 48, "SPAGEHTTI"),
+    box(20, 60, 180, 88, "CARROTS"),
+    box(300, 22, 520, 50, "007680801101"),
+    box(300, 61, 520, 89, "062891540919"),
+    box(700, 18, 780, 46, "$2.47 D"),
+]
+
+def test_boxes_join_into_rows():
+    assert join_text_boxes(RECEIPT_BOXES) == (
+        "SPAGEHTTI 007680801101 $2.47 D\n"
+        "CARROTS 062891540919 $3.47 D"
+    )
+
+def test_joined_rows_parse_into_items():
+    items = parser.parse_receipt_text(join_text_boxes(RECEIPT_BOXES))["items"]
+    assert [(item["name"], item["total_price"]) for item in items] == [("SPAGEHTTI", 2.47), ("CARROTS", 3.47)]
+
+def test_no_boxes():
+    assert join_text_boxes([]) == ""
+
+if __name__ == "__main__":
+    test_boxes_join_into_rows()
+    test_joined_rows_parse_into_items()
+    test_no_boxes()
+    print("✅ EasyOCR boxes join into parseable receipt lines")
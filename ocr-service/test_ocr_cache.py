@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Check the OCR result cache: single-flight computes, failures not cached, LRU eviction
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app import OCRResultCache
+
+def test_concurrent_duplicates_compute_once():
+    cache = OCRResultCache(8)
+    key = OCRResultCache.key_for(b"same receipt")
+    calls = []
+    start = threading.Barrier(8)
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)  # long enough for every other request to be waiting on it
+        return "MILK $3.99"
+
+    def request():
+        start.wait()
+        return cache.get_or_compute(key, compute)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: request(), range(8)))
+
+    assert len(calls) == 1
+    assert results == ["MILK $3.99"] * 8
+    assert cache._in_flight == {}
+
+def test_empty_text_is_not_cached():
+    cache = OCRResultCache(8)
+    key = OCRResultCache.key_for(b"unreadable")
+    assert cache.get_or_compute(key, lambda: "") == ""
+    assert cache.get(key) is None
+    # The next upload of the same image gets another OCR attempt
+    assert cache.get_or_compute(key, lambda: "BREAD $2.50") == "BREAD $2.50"
+    assert cache.get(key) == "BREAD $2.50"
+
+def test_lru_eviction_at_capacity():
+    cache = OCRResultCache(2)
+    cache.put(b"a", "A")
+    cache.put(b"b", "B")
+    assert cache.get(b"a") == "A"  # a is now the most recently used
+    cache.put(b"c", "C")
+    assert cache.get(b"b") is None
+    assert cache.get(b"a") == "A"
+    assert cache.get(b"c") == "C"
+
+def test_zero_size_disables_cache():
+    cache = OCRResultCache(0)
+    cache.put(b"a", "A")
+    assert cache.get(b"a") is None
+
+if __name__ == "__main__":
+    test_concurrent_duplicates_compute_once()
+    test_empty_text_is_not_cached()
+    test_lru_eviction_at_capacity()
+    test_zero_size_disables_cache()
+    print("✅ OCR result cache checks passed")
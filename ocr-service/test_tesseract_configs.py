@@ -1,8 +1,24 @@
 import cv2
-import numpy as np
 import pytesseract
-from PIL import Image, ImageEnhance, ImageFilter
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pil_filters import enhance_contrast, sharpen
+
+# The grid runs many Tesseract processes at once; keep each to a single thread.
+# Set before tesserocr loads libtesseract, which reads it only at load time
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+# Optional in-process Tesseract: each worker thread keeps its engines loaded
+# instead of spawning tesseract (and reloading the model) for every config
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+# PNG-encoding every preprocessing version costs more than some of the OCR
+# runs, so only write debug images when asked to (same switch as the service)
+SAVE_DEBUG_IMAGES = os.getenv("OCR_SAVE_DEBUG_IMAGE", "false").lower() == "true"
 
 def load_and_preprocess_image(image_path):
     """Load and create multiple preprocessing versions of the image"""
@@ -23,7 +39,7 @@ def load_and_preprocess_image(image_path):
     versions['grayscale'] = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
     
     # 3. Adaptive threshold (Gaussian)
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    gray = versions['grayscale']
     versions['adaptive_gaussian'] = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
     
     # 4. Adaptive threshold (Mean)
@@ -38,22 +54,17 @@ def load_and_preprocess_image(image_path):
     _, versions['thresh_150'] = cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY)
     
     # 7. Enhanced contrast + sharpness
-    pil_img = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
-    enhancer = ImageEnhance.Contrast(pil_img)
-    enhanced = enhancer.enhance(2.0)
-    sharpened = enhanced.filter(ImageFilter.SHARPEN)
-    enhanced_array = cv2.cvtColor(np.array(sharpened), cv2.COLOR_RGB2BGR)
-    enhanced_gray = cv2.cvtColor(enhanced_array, cv2.COLOR_BGR2GRAY)
+    enhanced_gray = cv2.cvtColor(sharpen(enhance_contrast(img)), cv2.COLOR_BGR2GRAY)
     _, versions['enhanced_otsu'] = cv2.threshold(enhanced_gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
     
     # 8. Denoised
     denoised = cv2.fastNlMeansDenoising(gray)
     _, versions['denoised_otsu'] = cv2.threshold(denoised, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
     
-    # 9. Morphological operations
-    kernel = np.ones((1, 1), np.uint8)
-    versions['morph_close'] = cv2.morphologyEx(versions['adaptive_gaussian'], cv2.MORPH_CLOSE, kernel)
-    versions['morph_open'] = cv2.morphologyEx(versions['adaptive_gaussian'], cv2.MORPH_OPEN, kernel)
+    # 9. Morphological operations (a 1x1 kernel leaves the image unchanged,
+    # so share the thresholded array instead of copying it twice)
+    versions['morph_close'] = versions['adaptive_gaussian']
+    versions['morph_open'] = versions['adaptive_gaussian']
     
     # 10. Inverted versions (sometimes helps)
     versions['adaptive_gaussian_inv'] = cv2.bitwise_not(versions['adaptive_gaussian'])
@@ -61,6 +72,30 @@ def load_and_preprocess_image(image_path):
     
     return versions
 
+_thread_tess_apis = threading.local()
+
+def tesserocr_text(img, psm, oem):
+    """OCR with this thread's engine for the OEM (switching PSM is cheap, OEM needs a reload)"""
+    apis = _thread_tess_apis.__dict__.setdefault('by_oem', {})
+    api = apis.get(oem)
+    if api is None:
+        api = apis[oem] = tesserocr.PyTessBaseAPI(oem=oem)
+    api.SetPageSegMode(psm)
+    h, w = img.shape[:2]
+    # Channels go in as stored, the same pixels pytesseract hands tesseract
+    bpp = 1 if img.ndim == 2 else img.shape[2]
+    api.SetImageBytes(img.tobytes(), w, h, bpp, w * bpp)
+    return api.GetUTF8Text()
+
+def run_tesseract(img, psm, oem):
+    """Run one Tesseract config, returning any error instead of raising it"""
+    try:
+        if tesserocr is not None:
+            return tesserocr_text(img, psm, oem)
+        return pytesseract.image_to_string(img, config=f'--psm {psm} --oem {oem}')
+    except Exception as e:
+        return e
+
 def test_tesseract_configs(image_versions):
     """Test different Tesseract configurations"""
     psm_modes = [3, 4, 6, 8, 11, 12, 13]
@@ -68,6 +103,18 @@ def test_tesseract_configs(image_versions):
     
     results = {}
     
+    # Tesseract runs outside the GIL (as a subprocess, or in tesserocr), so run the
+    # whole grid at once. Versions that share one array (the 1x1 morphology ones)
+    # would give the same text, so each distinct image is only OCR'd once per config
+    configs = {(psm, oem): f'--psm {psm} --oem {oem}' for psm in psm_modes for oem in oem_modes}
+    distinct_images = {id(img): img for img in image_versions.values()}
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        ocr_texts = {
+            (img_id, config): executor.submit(run_tesseract, img, psm, oem)
+            for img_id, img in distinct_images.items()
+            for (psm, oem), config in configs.items()
+        }
+    
     for version_name, img in image_versions.items():
         print(f"\nTesting version: {version_name}")
         results[version_name] = {}
@@ -76,7 +123,9 @@ def test_tesseract_configs(image_versions):
             for oem in oem_modes:
                 try:
                     config = f'--psm {psm} --oem {oem}'
-                    text = pytesseract.image_to_string(img, config=config)
+                    text = ocr_texts[(id(img), config)].result()
+                    if isinstance(text, Exception):
+                        raise text
                     
                     # Clean up text
                     text = text.strip()
@@ -164,9 +213,10 @@ def main():
         versions = load_and_preprocess_image(image_file)
         
         # Save debug images
-        os.makedirs("debug_images", exist_ok=True)
-        for name, img in versions.items():
-            cv2.imwrite(f"debug_images/{name}.png", img)
+        if SAVE_DEBUG_IMAGES:
+            os.makedirs("debug_images", exist_ok=True)
+            for name, img in versions.items():
+                cv2.imwrite(f"debug_images/{name}.png", img)
         
         # Test Tesseract configurations
         results = test_tesseract_configs(versions)
@@ -1,9 +1,17 @@
 import cv2
-import numpy as np
 import pytesseract
-from PIL import Image, ImageEnhance, ImageFilter
 import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pil_filters import enhance_contrast, sharpen
+
+# The grid below runs many Tesseract processes at once; one thread each keeps
+# them from fighting over the cores
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+# PNG-encoding every pipeline's output costs more than some of the OCR runs,
+# so only write debug images when asked to (same switch as the service)
+SAVE_DEBUG_IMAGES = os.getenv("OCR_SAVE_DEBUG_IMAGE", "false").lower() == "true"
 
 # Ensure results directory exists and is clean
 RESULTS_DIR = "results_finetune"
@@ -34,64 +42,74 @@ def preprocess_resize(img, width=1200):
 def preprocess_denoise(img):
     return cv2.fastNlMeansDenoisingColored(img, None, 10, 10, 7, 21)
 
-def preprocess_adaptive_gaussian(img):
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+def preprocess_adaptive_gaussian(gray):
     return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
 
-def preprocess_adaptive_mean(img):
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+def preprocess_adaptive_mean(gray):
     return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY, 11, 2)
 
-def preprocess_otsu(img):
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+def preprocess_otsu(gray):
     _, th = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
     return th
 
-def preprocess_contrast(img):
-    pil_img = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
-    enhancer = ImageEnhance.Contrast(pil_img)
-    enhanced = enhancer.enhance(2.0)
-    return cv2.cvtColor(np.array(enhanced), cv2.COLOR_RGB2BGR)
-
-def preprocess_sharpen(img):
-    pil_img = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
-    sharpened = pil_img.filter(ImageFilter.SHARPEN)
-    return cv2.cvtColor(np.array(sharpened), cv2.COLOR_RGB2BGR)
+# Convert to grayscale once; the threshold pipelines all start from it
+gray = preprocess_grayscale(img)
 
 # List of preprocessing pipelines (name, function)
 preprocess_pipelines = [
     ("none", preprocess_none),
-    ("grayscale", preprocess_grayscale),
+    ("grayscale", lambda img: gray),
     ("resize", lambda img: preprocess_resize(img, 1200)),
     ("denoise", preprocess_denoise),
-    ("adaptive_gaussian", preprocess_adaptive_gaussian),
-    ("adaptive_mean", preprocess_adaptive_mean),
-    ("otsu", preprocess_otsu),
-    ("contrast", preprocess_contrast),
-    ("sharpen", preprocess_sharpen),
+    ("adaptive_gaussian", lambda img: preprocess_adaptive_gaussian(gray)),
+    ("adaptive_mean", lambda img: preprocess_adaptive_mean(gray)),
+    ("otsu", lambda img: preprocess_otsu(gray)),
+    ("contrast", enhance_contrast),
+    ("sharpen", sharpen),
 ]
 
+# Score: count of key receipt words
+keywords = ["total", "store", "walmart", "survey", "gift", "card", "amount", "price", "item", "kg", "$", "visa"]
+
 # Tesseract configs to try
 psm_modes = [3, 4, 6, 11, 12, 13]
 oem_modes = [1, 3]
 
-# Run grid search
-results = []
+def run_tesseract(image, config):
+    try:
+        return pytesseract.image_to_string(image, config=config)
+    except Exception as e:
+        return f"[ERROR: {e}]"
+
+# Preprocess every pipeline up front
+processed_images = []
 for pname, pfunc in preprocess_pipelines:
     processed = pfunc(img)
     # Save debug image
-    debug_img_path = os.path.join(RESULTS_DIR, f"debug_{pname}.png")
-    if len(processed.shape) == 2:
-        cv2.imwrite(debug_img_path, processed)
-    else:
-        cv2.imwrite(debug_img_path, cv2.cvtColor(processed, cv2.COLOR_BGR2RGB))
+    debug_img_path = None
+    if SAVE_DEBUG_IMAGES:
+        debug_img_path = os.path.join(RESULTS_DIR, f"debug_{pname}.png")
+        if len(processed.shape) == 2:
+            cv2.imwrite(debug_img_path, processed)
+        else:
+            cv2.imwrite(debug_img_path, cv2.cvtColor(processed, cv2.COLOR_BGR2RGB))
+    processed_images.append((pname, processed, debug_img_path))
+
+# Each call is its own Tesseract subprocess, so run the whole grid in parallel
+with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+    ocr_texts = {
+        (pname, psm, oem): executor.submit(run_tesseract, processed, f"--psm {psm} --oem {oem}")
+        for pname, processed, _ in processed_images
+        for psm in psm_modes
+        for oem in oem_modes
+    }
+
+# Run grid search
+results = []
+for pname, processed, debug_img_path in processed_images:
     for psm in psm_modes:
         for oem in oem_modes:
-            config = f"--psm {psm} --oem {oem}"
-            try:
-                text = pytesseract.image_to_string(processed, config=config)
-            except Exception as e:
-                text = f"[ERROR: {e}]"
+            text = ocr_texts[(pname, psm, oem)].result()
             # Save text output
             text_path = os.path.join(RESULTS_DIR, f"{pname}_psm{psm}_oem{oem}.txt")
             with open(text_path, "w") as f:
@@ -99,11 +117,11 @@ for pname, pfunc in preprocess_pipelines:
             # Analyze result
             lines = text.splitlines()
             num_lines = len(lines)
-            num_words = sum(len(line.split()) for line in lines)
+            num_words = len(text.split())  # same count as splitting each line
             num_chars = len(text)
-            # Score: count of key receipt words
-            keywords = ["total", "store", "walmart", "survey", "gift", "card", "amount", "price", "item", "kg", "$", "visa"]
-            keyword_score = sum(text.lower().count(k) for k in keywords)
+            # Score: count of key receipt words (lowercase the text once, not per keyword)
+            text_lower = text.lower()
+            keyword_score = sum(text_lower.count(k) for k in keywords)
             # Save result
             results.append({
                 "pipeline": pname,
@@ -125,6 +143,7 @@ for r in results[:10]:
     print(f"Pipeline: {r['pipeline']}, PSM: {r['psm']}, OEM: {r['oem']}, Words: {r['num_words']}, Keywords: {r['keyword_score']}")
     print(f"  Preview: {r['preview']}")
     print(f"  Text file: {r['text_path']}")
-    print(f"  Debug image: {r['debug_img_path']}")
+    if r['debug_img_path']:
+        print(f"  Debug image: {r['debug_img_path']}")
     print()
 print(f"All results saved in: {RESULTS_DIR}/") 
\ No newline at end of file
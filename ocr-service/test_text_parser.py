@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Check the compiled-regex lookups in text_parser against the plain loops they replaced
+"""
+
+import random
+from text_parser import parser, MERCHANT_NAMES, STORE_RE
+
+def reference_merchant(text):
+    """The original _extract_merchant: first merchant in priority order that appears"""
+    text_lower = text.lower()
+    for merchant_key, merchant_name in MERCHANT_NAMES.items():
+        if merchant_key in text_lower:
+            return merchant_name
+    store_match = STORE_RE.search(text)
+    if store_match:
+        return f"Store #{store_match.group(1)}"
+    return "Unknown Merchant"
+
+def reference_category(item_name):
+    """The original _categorize_item: first category in order with a keyword in the name"""
+    item_lower = item_name.lower()
+    for category, keywords in parser.category_keywords.items():
+        for keyword in keywords:
+            if keyword in item_lower:
+                return category
+    return "processed"
+
+def random_text(rng, pieces, letters, max_parts=8):
+    """Glue random known pieces and letters together, so keywords overlap and touch"""
+    return ''.join(
+        rng.choice(pieces) if rng.random() < 0.5 else rng.choice(letters)
+        for _ in range(rng.randint(0, max_parts))
+    )
+
+def test_merchant_priority():
+    """A lower-priority name must not hide a higher-priority one it overlaps"""
+    assert parser._extract_merchant("WHOLE FOODSAFEWAY") == "Safeway"
+    assert parser._extract_merchant("Trader Joe's at WALMART") == "Walmart"
+    assert parser._extract_merchant("STORE 3156") == "Store #3156"
+    assert parser._extract_merchant("corner shop") == "Unknown Merchant"
+
+def test_merchant_matches_reference():
+    rng = random.Random(0)
+    pieces = list(MERCHANT_NAMES) + [key.upper() for key in MERCHANT_NAMES] + ['STORE 12', 'whole ', 'foods', 'joe']
+    for _ in range(20000):
+        text = random_text(rng, pieces, 'abcdefghijklmnopqrstuvwxyzWS ')
+        assert parser._extract_merchant(text) == reference_merchant(text), text
+
+def test_category_priority():
+    """Keywords from several categories resolve to the earliest category"""
+    assert parser._categorize_item("CHICKEN SOUP") == "meat"
+    assert parser._categorize_item("ICE CREAM") == "dairy"  # 'cream' before sweets' 'ice cream'
+    assert parser._categorize_item("APPLE JUICE") == "fruits"
+    assert parser._categorize_item("MYSTERY ITEM") == "processed"
+
+def test_category_matches_reference():
+    rng = random.Random(0)
+    keywords = [keyword for words in parser.category_keywords.values() for keyword in words]
+    pieces = keywords + [keyword.upper() for keyword in keywords]
+    for _ in range(20000):
+        name = random_text(rng, pieces, 'abcdeimnorstuz ')
+        assert parser._categorize_item(name) == reference_category(name), name
+
+if __name__ == "__main__":
+    test_merchant_priority()
+    test_merchant_matches_reference()
+    test_category_priority()
+    test_category_matches_reference()
+    print("✅ text_parser lookups match the reference loops")
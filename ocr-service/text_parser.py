@@ -2,6 +2,47 @@ import re
 import json
 from typing import List, Dict, Any
 
+# Patterns used on every receipt line, compiled once at import
+TOTAL_RE = re.compile(r'TOTAL\s+\$?(\d+\.\d{2})', re.IGNORECASE)
+# Weighted items: ITEM_NAME WEIGHT kg @ $PRICE/kg $TOTAL_PRICE
+WEIGHTED_ITEM_RE = re.compile(r'(\d+\.\d{3})\s+kg\s+@\s+\$(\d+\.\d{2})/kg\s+\$(\d+\.\d{2})')
+# Regular items: $XX.XX at the end of the line
+REGULAR_ITEM_RE = re.compile(r'\$(\d+\.\d{2})\s*[A-Z]?\s*$')
+
+# Known merchants, in priority order when a receipt mentions several
+MERCHANT_NAMES = {
+    'walmart': 'Walmart',
+    'target': 'Target', 
+    'kroger': 'Kroger',
+    'safeway': 'Safeway',
+    'costco': 'Costco',
+    'whole foods': 'Whole Foods',
+    'trader joe': 'Trader Joe\'s'
+}
+# One scan of the text finds every merchant mention instead of one pass per name.
+# A lookahead capture reports matches at every position, so one name can't use up
+# characters another needs (e.g. "safeway" inside "WHOLE FOODSAFEWAY")
+MERCHANT_RE = re.compile('(?=(' + '|'.join(map(re.escape, MERCHANT_NAMES)) + '))', re.IGNORECASE)
+STORE_RE = re.compile(r'STORE\s+(\d+)', re.IGNORECASE)
+
+# Words marking header, total, tax and payment lines. Matched as substrings of the
+# lowercased line (so 'store' also skips 'STORE#'), in one scan instead of one per word
+SKIP_WORDS = [
+    'total', 'subtotal', 'tax', 'hst', 'gst', 'pst', 'change', 'cash', 'card', 
+    'payment', 'receipt', 'survey', 'win', 'rules', 'store', 'st#', 'op#', 'te#', 
+    'tr#', 'visa', 'mastercard', 'debit', 'credit', 'charge', 'pot wht', 'complete',
+    'gift', 'contest', 'regulations', 'details', 'road', 'unit', 'phone', 'address'
+]
+SKIP_LINE_RE = re.compile('|'.join(map(re.escape, SKIP_WORDS)))
+
+# Item name cleanup, applied in this order (each step sees the previous one's output)
+SKU_RE = re.compile(r'\d{12}')  # SKU numbers (12-digit numbers)
+LONG_NUMBER_RE = re.compile(r'\d{6,}')  # other long numbers
+CODE_RE = re.compile(r'[A-Z]{1,3}\s*\d+')  # codes like "D68", "QTY 1"
+GRAM_WEIGHT_RE = re.compile(r'\d{1,3}G')  # weights like "400G"
+WHITESPACE_RE = re.compile(r'\s+')
+TRAILING_CODE_RE = re.compile(r'\s+[A-Z]\s*$')  # trailing letters that are likely codes
+
 class ReceiptTextParser:
     def __init__(self):
         # Food category keywords
@@ -16,6 +57,16 @@ class ReceiptTextParser:
             'processed': ['chip', 'snack', 'cereal', 'sauce', 'soup', 'can', 'jar', 'bd', 'chipits']
         }
         
+        # Keyword -> category, listed in category priority order. A lookahead
+        # alternation over them finds every keyword occurrence in one scan; at any
+        # position the first alternative is the highest-priority match there
+        self._keyword_category = {}
+        for category, keywords in self.category_keywords.items():
+            for keyword in keywords:
+                self._keyword_category.setdefault(keyword, category)
+        self._category_rank = {category: i for i, category in enumerate(self.category_keywords)}
+        self._category_keyword_re = re.compile('(?=(' + '|'.join(map(re.escape, self._keyword_category)) + '))')
+        
         # Default emissions by category
         self.category_emissions = {
             'vegetables': 0.4,
@@ -35,6 +86,7 @@ class ReceiptTextParser:
         
         lines = text.strip().split('\n')
         items = []
+        total_emissions = 0
         merchant = "Unknown Merchant"
         total = None
         
@@ -58,9 +110,8 @@ class ReceiptTextParser:
             item_data = self._parse_line(line)
             if item_data:
                 items.append(item_data)
-        
-        # Calculate total emissions
-        total_emissions = sum(item.get('carbon_emissions', 0) for item in items)
+                # Accumulate emissions here rather than re-walking items afterwards
+                total_emissions += item_data['carbon_emissions']
         
         return {
             "items": items,
@@ -73,25 +124,14 @@ class ReceiptTextParser:
 
     def _extract_merchant(self, text: str) -> str:
         """Extract merchant name from receipt text"""
-        text_lower = text.lower()
-        
         # Look for common merchant names
-        merchants = {
-            'walmart': 'Walmart',
-            'target': 'Target', 
-            'kroger': 'Kroger',
-            'safeway': 'Safeway',
-            'costco': 'Costco',
-            'whole foods': 'Whole Foods',
-            'trader joe': 'Trader Joe\'s'
-        }
-        
-        for merchant_key, merchant_name in merchants.items():
-            if merchant_key in text_lower:
+        found = {match.lower() for match in MERCHANT_RE.findall(text)}
+        for merchant_key, merchant_name in MERCHANT_NAMES.items():
+            if merchant_key in found:
                 return merchant_name
         
         # If no specific merchant found, look for store number pattern
-        store_match = re.search(r'STORE\s+(\d+)', text, re.IGNORECASE)
+        store_match = STORE_RE.search(text)
         if store_match:
             return f"Store #{store_match.group(1)}"
         
@@ -100,7 +140,7 @@ class ReceiptTextParser:
     def _extract_total(self, text: str) -> float | None:
         """Extract total amount from receipt text"""
         # Look for TOTAL pattern
-        total_match = re.search(r'TOTAL\s+\$?(\d+\.\d{2})', text, re.IGNORECASE)
+        total_match = TOTAL_RE.search(text)
         if total_match:
             return float(total_match.group(1))
         
@@ -108,16 +148,7 @@ class ReceiptTextParser:
 
     def _should_skip_line(self, line: str) -> bool:
         """Determine if a line should be skipped (not an item)"""
-        line_lower = line.lower()
-        
-        skip_words = [
-            'total', 'subtotal', 'tax', 'hst', 'gst', 'pst', 'change', 'cash', 'card', 
-            'payment', 'receipt', 'survey', 'win', 'rules', 'store', 'st#', 'op#', 'te#', 
-            'tr#', 'visa', 'mastercard', 'debit', 'credit', 'charge', 'pot wht', 'complete',
-            'gift', 'contest', 'regulations', 'details', 'road', 'unit', 'phone', 'address'
-        ]
-        
-        return any(skip_word in line_lower for skip_word in skip_words)
+        return SKIP_LINE_RE.search(line.lower()) is not None
 
     def _parse_line(self, line: str) -> Dict[str, Any] | None:
         """Parse a single line to extract item information"""
@@ -135,9 +166,7 @@ class ReceiptTextParser:
 
     def _parse_weighted_item(self, line: str) -> Dict[str, Any] | None:
         """Parse items sold by weight (e.g., produce)"""
-        # Pattern for weighted items: ITEM_NAME WEIGHT kg @ $PRICE/kg $TOTAL_PRICE
-        weight_pattern = r'(\d+\.\d{3})\s+kg\s+@\s+\$(\d+\.\d{2})/kg\s+\$(\d+\.\d{2})'
-        weight_match = re.search(weight_pattern, line)
+        weight_match = WEIGHTED_ITEM_RE.search(line)
         
         if weight_match:
             weight = float(weight_match.group(1))
@@ -169,9 +198,7 @@ class ReceiptTextParser:
 
     def _parse_regular_item(self, line: str) -> Dict[str, Any] | None:
         """Parse regular items with fixed prices"""
-        # Look for price pattern: $XX.XX at the end of the line
-        price_pattern = r'\$(\d+\.\d{2})\s*[A-Z]?\s*$'
-        price_match = re.search(price_pattern, line)
+        price_match = REGULAR_ITEM_RE.search(line)
         
         if price_match:
             price = float(price_match.group(1))
@@ -202,29 +229,27 @@ class ReceiptTextParser:
     def _clean_item_name(self, item_name: str) -> str:
         """Clean up item name by removing SKUs, codes, and extra text"""
         # Remove SKU numbers (12-digit numbers)
-        cleaned = re.sub(r'\d{12}', '', item_name)
+        cleaned = SKU_RE.sub('', item_name)
         
         # Remove other common codes and patterns
-        cleaned = re.sub(r'\d{6,}', '', cleaned)  # Remove other long numbers
-        cleaned = re.sub(r'[A-Z]{1,3}\s*\d+', '', cleaned)  # Remove codes like "D68", "QTY 1"
-        cleaned = re.sub(r'\d{1,3}G', '', cleaned)  # Remove weights like "400G"
+        cleaned = LONG_NUMBER_RE.sub('', cleaned)
+        cleaned = CODE_RE.sub('', cleaned)
+        cleaned = GRAM_WEIGHT_RE.sub('', cleaned)
         
         # Remove extra whitespace and clean up
-        cleaned = re.sub(r'\s+', ' ', cleaned).strip()
+        cleaned = WHITESPACE_RE.sub(' ', cleaned).strip()
         
         # Remove trailing letters that are likely codes
-        cleaned = re.sub(r'\s+[A-Z]\s*$', '', cleaned)
+        cleaned = TRAILING_CODE_RE.sub('', cleaned)
         
         return cleaned
 
     def _categorize_item(self, item_name: str) -> str:
         """Categorize item based on keywords"""
-        item_lower = item_name.lower()
-        
-        for category, keywords in self.category_keywords.items():
-            for keyword in keywords:
-                if keyword in item_lower:
-                    return category
+        hits = self._category_keyword_re.findall(item_name.lower())
+        if hits:
+            # Same answer as checking categories in order: the highest-priority one hit
+            return min((self._keyword_category[keyword] for keyword in hits), key=self._category_rank.__getitem__)
         
         return "processed"  # Default category
 
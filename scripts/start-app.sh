@@ -29,6 +29,18 @@ print_error() {
     echo -e "${RED}[ERROR]${NC} $1"
 }
 
+# Poll a URL until it answers instead of sleeping a fixed time (gives up after ~30s)
+wait_for_url() {
+    local url=$1
+    for _ in $(seq 1 150); do
+        if curl -s "$url" > /dev/null; then
+            return 0
+        fi
+        sleep 0.2
+    done
+    return 1
+}
+
 # Check if we're in the right directory
 if [ ! -f "package.json" ]; then
     print_error "Please run this script from the project root directory"
@@ -59,14 +71,13 @@ pip install -r requirements.txt > /dev/null 2>&1
 
 # Start OCR service in background
 print_status "Starting OCR service on http://localhost:8000"
-python app.py &
+# Extra OCR_WORKERS processes split the cores (exported so the app sizes its pool)
+export OCR_WORKERS="${OCR_WORKERS:-1}"
+uvicorn app:app --host 127.0.0.1 --port 8000 --workers "$OCR_WORKERS" &
 OCR_PID=$!
 
-# Wait a moment for OCR service to start
-sleep 3
-
-# Check if OCR service is running
-if ! curl -s http://localhost:8000/health > /dev/null; then
+# Wait for the OCR service to come up
+if ! wait_for_url http://localhost:8000/health; then
     print_warning "Warning: OCR service may not be running properly"
 else
     print_success "OCR service is running"
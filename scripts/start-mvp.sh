@@ -25,7 +25,23 @@ kill_port() {
     local port=$1
     echo -e "${YELLOW}🔄 Killing process on port $port...${NC}"
     lsof -ti:$port | xargs kill -9 2>/dev/null || true
-    sleep 2
+    # wait until the port is actually free rather than a fixed delay
+    for _ in $(seq 1 50); do
+        lsof -Pi :$port -sTCP:LISTEN -t >/dev/null || break
+        sleep 0.1
+    done
+}
+
+# Poll a URL until it answers instead of sleeping a fixed time (gives up after ~30s)
+wait_for_url() {
+    local url=$1
+    for _ in $(seq 1 150); do
+        if curl -s "$url" > /dev/null; then
+            return 0
+        fi
+        sleep 0.2
+    done
+    return 1
 }
 
 # Check and kill port 8000 (OCR service)
@@ -60,11 +76,8 @@ echo -e "${GREEN}🚀 Starting OCR service...${NC}"
 python main.py &
 OCR_PID=$!
 
-# Wait a moment for OCR service to start
-sleep 3
-
-# Check if OCR service is running
-if curl -s http://localhost:8000/health > /dev/null; then
+# Wait for the OCR service to come up
+if wait_for_url http://localhost:8000/health; then
     echo -e "${GREEN}✅ OCR service is running on http://localhost:8000${NC}"
 else
     echo -e "${RED}❌ Failed to start OCR service${NC}"
@@ -88,11 +101,8 @@ echo -e "${GREEN}🚀 Starting Next.js app...${NC}"
 npm run dev &
 NEXT_PID=$!
 
-# Wait a moment for Next.js to start
-sleep 5
-
-# Check if Next.js is running
-if curl -s http://localhost:3000 > /dev/null; then
+# Wait for Next.js to come up
+if wait_for_url http://localhost:3000; then
     echo -e "${GREEN}✅ Next.js app is running on http://localhost:3000${NC}"
 else
     echo -e "${RED}❌ Failed to start Next.js app${NC}"
@@ -27,5 +27,7 @@ echo "Starting OCR service on http://localhost:8000"
 echo "Health check: http://localhost:8000/health"
 echo "Press Ctrl+C to stop"
 
-# Run the service
-python app.py 
\ No newline at end of file
+# Run the service. One process already runs OCR on a thread per core; extra
+# OCR_WORKERS processes split the cores (exported so the app sizes its pool)
+export OCR_WORKERS="${OCR_WORKERS:-1}"
+uvicorn app:app --host 127.0.0.1 --port 8000 --workers "$OCR_WORKERS"
@@ -150,11 +150,13 @@ Expected JSON format:
       'Content-Type': 'application/json',
     },
     body: JSON.stringify({
-      model: 'gpt-4',
+      model: 'gpt-4o-mini',
+      // JSON mode: the reply is always a single JSON object, never fenced or wrapped in prose
+      response_format: { type: 'json_object' },
       messages: [
         {
           role: 'system',
-          content: 'You are a receipt parsing assistant. Extract items, merchant, total, and date from receipt text. Return only valid JSON.',
+          content: 'You are a receipt parsing assistant. Extract items, merchant, total, and date from receipt text.',
         },
         {
           role: 'user',
@@ -177,12 +179,7 @@ Expected JSON format:
   }
 
   try {
-    const jsonMatch = content.match(/\{[\s\S]*\}/);
-    if (!jsonMatch) {
-      throw new Error('No JSON found in response');
-    }
-
-    const parsed = JSON.parse(jsonMatch[0]);
+    const parsed = JSON.parse(content);
     return ItemParsingSchema.parse(parsed);
   } catch (parseError) {
     throw new Error('Failed to parse OpenAI response as JSON');
@@ -2,6 +2,7 @@ import { logger } from "@/lib/logger";
 import { z } from "zod";
 import fs from 'fs';
 import path from 'path';
+import { createHash } from 'crypto';
 import { loadFoodDataset, searchFoodByName, getEmissionsByName, getAllFoods } from '@/lib/data/food-dataset';
 import axios from 'axios';
 
@@ -139,6 +140,23 @@ function saveGroqDebug(inputText: string, output: string, suffix: string) {
   fs.writeFileSync(outPath, output);
 }
 
+// String literals, comments and trailing commas; strings are matched first so a
+// "//" or ",]" inside an item name is left alone
+const JSON_SLIP_RE = /("(?:[^"\\]|\\.)*")|\/\*[\s\S]*?\*\/|\/\/[^\n]*|,(\s*[\]}])/g;
+
+/**
+ * JSON.parse that also accepts the slips LLMs make in JSON replies (comments and
+ * trailing commas) by stripping them, outside string values, once strict parsing fails
+ */
+function parseLenientJson(text: string): any {
+  try {
+    return JSON.parse(text);
+  } catch {
+    const cleaned = text.replace(JSON_SLIP_RE, (_match, str, closer) => str ?? closer ?? '');
+    return JSON.parse(cleaned);
+  }
+}
+
 // Load dataset at startup
 loadFoodDataset();
 
@@ -282,9 +300,15 @@ export class GroqAIService {
     fuzzySearchThreshold: 0.3,
   };
 
+  private static readonly PARSE_CACHE_SIZE = 500;
+  private static readonly MAX_CONCURRENT_ITEMS = 8;
+
   private readonly config: GroqAIServiceConfig;
   private foodDatabase: FoodDatabaseItem[] = [];
   private isInitialized = false;
+  // Parsed items by prompt hash, oldest first, so re-uploads and retries of the
+  // same receipt text skip the Groq round trip
+  private readonly parseCache = new Map<string, any[]>();
 
   constructor(config?: Partial<GroqAIServiceConfig>) {
     this.config = { ...GroqAIService.DEFAULT_CONFIG, ...config };
@@ -644,9 +668,28 @@ export class GroqAIService {
 
     try {
       const prompt = this.buildReceiptParsingPrompt(ocrText);
+      const cacheKey = this.parseCacheKey(prompt);
+      const cached = this.parseCache.get(cacheKey);
+      if (cached) {
+        // Move to the newest end so frequently repeated receipts stay cached
+        this.parseCache.delete(cacheKey);
+        this.parseCache.set(cacheKey, cached);
+        logger.info("Groq AI parse cache hit", context);
+        return {
+          success: true,
+          data: structuredClone(cached),
+          processingTime: Date.now() - startTime,
+          retryCount: 0,
+        };
+      }
+
       const response = await this.callGroqAI(prompt);
       
-      const items = await this.extractItemsFromResponse(response);
+      const { items, fromJson } = await this.extractItemsFromResponse(response);
+      // Items salvaged from a malformed reply shouldn't be pinned; let retries ask again
+      if (fromJson) {
+        this.cacheParsedItems(cacheKey, items);
+      }
       
       const processingTime = Date.now() - startTime;
       return {
@@ -668,6 +711,33 @@ export class GroqAIService {
     }
   }
 
+  /**
+   * Cache key for a parsing call: the same model settings and prompt get the same answer
+   */
+  private parseCacheKey(prompt: string): string {
+    return createHash("sha256")
+      .update(`${this.config.model}|${this.config.temperature}|${this.config.maxTokens}|${prompt}`)
+      .digest("hex");
+  }
+
+  /**
+   * Remember parsed items, evicting the least recently used entry when full
+   */
+  private cacheParsedItems(key: string, items: any[]): void {
+    // An empty list usually means the response couldn't be parsed; ask again next time
+    if (items.length === 0) {
+      return;
+    }
+    // Keep a copy so callers changing their items can't alter later cache hits
+    this.parseCache.set(key, structuredClone(items));
+    if (this.parseCache.size > GroqAIService.PARSE_CACHE_SIZE) {
+      const oldest = this.parseCache.keys().next().value;
+      if (oldest !== undefined) {
+        this.parseCache.delete(oldest);
+      }
+    }
+  }
+
   /**
    * Estimate emissions with retry mechanism
    */
@@ -784,65 +854,88 @@ ${ocrText.substring(0, 500)}...`;
   ): Promise<ParsedFoodItem[]> {
     const { enableFuzzyMatching = true, enableFallbacks = true } = options;
     
-    const processedItems: ParsedFoodItem[] = [];
-    
-    for (const item of items) {
-      let dbMatch: FoodDatabaseItem | null = null;
-      
-      if (enableFuzzyMatching) {
-        dbMatch = this.matchWithDatabase(item.canonical_name || item.name);
+    // Items are independent, so run their network-bound emissions lookups
+    // concurrently, a few at a time so a long receipt doesn't trip rate limits
+    const processedItems: ParsedFoodItem[] = new Array(items.length);
+    let next = 0;
+    const worker = async () => {
+      while (next < items.length) {
+        const index = next++;
+        processedItems[index] = await this.processItemWithFallbacks(
+          items[index], enableFuzzyMatching, enableFallbacks, context
+        );
       }
+    };
+    await Promise.all(
+      Array.from({ length: Math.min(GroqAIService.MAX_CONCURRENT_ITEMS, items.length) }, worker)
+    );
 
-      let carbonEmissions = dbMatch 
-        ? dbMatch.emissions * (item.quantity > 0 ? item.quantity : 1)
-        : undefined;
-
-      let source = dbMatch ? "dataset" : "ai_estimation";
-      let confidence = dbMatch ? 1.0 : 0.7;
-      let status = dbMatch ? "processed" : "ai_estimated";
-
-      // If no database match and fallbacks are enabled, estimate emissions with Groq AI
-      if (!dbMatch && enableFallbacks && item.is_food !== false) {
-        try {
-          const emissionsResult = await this.estimateEmissionsWithGroqAI(item, context);
-          if (emissionsResult.success && emissionsResult.data) {
-            carbonEmissions = emissionsResult.data.carbon_emissions;
-            confidence = emissionsResult.data.confidence;
-            source = "groq_ai";
-            status = "ai_estimated";
-        }
-        } catch (error) {
-          logger.warn("Failed to estimate emissions with Groq AI", {
-            error: error instanceof Error ? error.message : String(error),
-            ...context,
-            itemName: item.name,
-          });
-      }
+    return processedItems;
+  }
+
+  /**
+   * Match a single parsed item against the database, falling back to Groq AI
+   * and then a default estimate for its emissions
+   */
+  private async processItemWithFallbacks(
+    item: any,
+    enableFuzzyMatching: boolean,
+    enableFallbacks: boolean,
+    context: Record<string, any>
+  ): Promise<ParsedFoodItem> {
+    let dbMatch: FoodDatabaseItem | null = null;
+    
+    if (enableFuzzyMatching) {
+      dbMatch = this.matchWithDatabase(item.canonical_name || item.name);
     }
 
-      // Final fallback to default emissions if still undefined
-      if (carbonEmissions === undefined && enableFallbacks) {
-        carbonEmissions = (Math.random() * 3 + 0.1) * (item.quantity > 0 ? item.quantity : 1); // Random between 0.1 and 3.1 kg CO2e
-        source = "fallback";
-        confidence = 0.5;
-        status = "fallback";
+    let carbonEmissions = dbMatch 
+      ? dbMatch.emissions * (item.quantity > 0 ? item.quantity : 1)
+      : undefined;
+
+    let source = dbMatch ? "dataset" : "ai_estimation";
+    let confidence = dbMatch ? 1.0 : 0.7;
+    let status = dbMatch ? "processed" : "ai_estimated";
+
+    // If no database match and fallbacks are enabled, estimate emissions with Groq AI
+    if (!dbMatch && enableFallbacks && item.is_food !== false) {
+      try {
+        const emissionsResult = await this.estimateEmissionsWithGroqAI(item, context);
+        if (emissionsResult.success && emissionsResult.data) {
+          carbonEmissions = emissionsResult.data.carbon_emissions;
+          confidence = emissionsResult.data.confidence;
+          source = "groq_ai";
+          status = "ai_estimated";
+        }
+      } catch (error) {
+        logger.warn("Failed to estimate emissions with Groq AI", {
+          error: error instanceof Error ? error.message : String(error),
+          ...context,
+          itemName: item.name,
+        });
       }
+    }
 
-      processedItems.push({
-        name: item.name || "Unknown Item",
-        canonical_name: dbMatch ? dbMatch.canonical : (item.canonical_name || item.name || "unknown"),
-        quantity: item.quantity > 0 ? item.quantity : 1,
-        total_price: item.total_price >= 0 ? item.total_price : 0,
-        category: dbMatch ? dbMatch.category : (item.category || "other"),
-        is_food: typeof item.is_food === "boolean" ? item.is_food : true,
-        carbon_emissions: carbonEmissions,
-        confidence,
-        source,
-        status,
-      });
+    // Final fallback to default emissions if still undefined
+    if (carbonEmissions === undefined && enableFallbacks) {
+      carbonEmissions = (Math.random() * 3 + 0.1) * (item.quantity > 0 ? item.quantity : 1); // Random between 0.1 and 3.1 kg CO2e
+      source = "fallback";
+      confidence = 0.5;
+      status = "fallback";
     }
-    
-    return processedItems;
+
+    return {
+      name: item.name || "Unknown Item",
+      canonical_name: dbMatch ? dbMatch.canonical : (item.canonical_name || item.name || "unknown"),
+      quantity: item.quantity > 0 ? item.quantity : 1,
+      total_price: item.total_price >= 0 ? item.total_price : 0,
+      category: dbMatch ? dbMatch.category : (item.category || "other"),
+      is_food: typeof item.is_food === "boolean" ? item.is_food : true,
+      carbon_emissions: carbonEmissions,
+      confidence,
+      source,
+      status,
+    };
   }
 
   /**
@@ -941,7 +1034,7 @@ Return only the number, no explanation or units.`;
   /**
    * Extract items from Groq AI response
    */
-  private async extractItemsFromResponse(response: any): Promise<any[]> {
+  private async extractItemsFromResponse(response: any): Promise<{ items: any[]; fromJson: boolean }> {
     const rawContent = response.choices[0].message.content.trim();
     logger.debug("Groq AI raw response", { rawContent });
 
@@ -952,9 +1045,9 @@ Return only the number, no explanation or units.`;
       
       if (jsonStart !== -1 && jsonEnd !== -1 && jsonEnd > jsonStart) {
         const jsonStr = rawContent.substring(jsonStart, jsonEnd + 1);
-        const parsed = JSON.parse(jsonStr);
+        const parsed = parseLenientJson(jsonStr);
         if (Array.isArray(parsed) && parsed.length > 0) {
-          return parsed;
+          return { items: parsed, fromJson: true };
         }
       }
       
@@ -964,16 +1057,16 @@ Return only the number, no explanation or units.`;
       
       if (objStart !== -1 && objEnd !== -1 && objEnd > objStart) {
         const jsonStr = rawContent.substring(objStart, objEnd + 1);
-        const parsed = JSON.parse(jsonStr);
+        const parsed = parseLenientJson(jsonStr);
         if (parsed.items && Array.isArray(parsed.items)) {
-          return parsed.items;
+          return { items: parsed.items, fromJson: true };
         }
         if (parsed.name) {
-          return [parsed];
+          return { items: [parsed], fromJson: true };
         }
       }
       
-      // Try to extract items from text format
+      // Last resort for replies that aren't JSON at all: salvage "name: value" lines
       const lines = rawContent.split('\n').filter((line: string) => line.trim().length > 0);
       const items: any[] = [];
       
@@ -997,7 +1090,7 @@ Return only the number, no explanation or units.`;
       }
       
       if (items.length > 0) {
-        return items;
+        return { items, fromJson: false };
       }
       
       throw new Error("No valid items found in Groq AI response");
@@ -1005,7 +1098,7 @@ Return only the number, no explanation or units.`;
       logger.error("Failed to parse Groq AI JSON", error instanceof Error ? error : new Error(String(error)), { rawContent });
       
       // Fallback: try with simpler prompt
-      return await this.extractItemsWithFallback(rawContent);
+      return { items: await this.extractItemsWithFallback(rawContent), fromJson: false };
     }
   }
 
@@ -1024,7 +1117,7 @@ Return only the number, no explanation or units.`;
       const fallbackEnd = fallbackRaw.lastIndexOf(']');
       
       if (fallbackStart !== -1 && fallbackEnd !== -1 && fallbackEnd > fallbackStart) {
-        return JSON.parse(fallbackRaw.substring(fallbackStart, fallbackEnd + 1));
+        return parseLenientJson(fallbackRaw.substring(fallbackStart, fallbackEnd + 1));
       } else {
         throw new Error("No JSON array found in fallback Groq AI response");
       }
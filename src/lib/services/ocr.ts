@@ -448,12 +448,29 @@ export class OCRService {
   }
 
   /**
-   * Process image using base64 endpoint
+   * Process image using upload endpoint (the buffer is already raw bytes, so
+   * sending it as base64 JSON would only add a third to the body and a decode)
    */
   private async processSingle(
     imageBuffer: Buffer,
     imageType: string,
     context: Record<string, any>
+  ): Promise<OCRResponse> {
+    // The upload endpoint only accepts image/* files, so PDFs keep the base64 endpoint
+    if (!imageType.startsWith("image/")) {
+      return this.processBase64Single(imageBuffer, imageType, context);
+    }
+    const extension = imageType.split("/")[1] || "jpg";
+    return this.processUploadSingle(imageBuffer, imageType, `receipt.${extension}`, context);
+  }
+
+  /**
+   * Process image using base64 endpoint
+   */
+  private async processBase64Single(
+    imageBuffer: Buffer,
+    imageType: string,
+    context: Record<string, any>
   ): Promise<OCRResponse> {
     const base64Image = imageBuffer.toString("base64");
     const payload = {